@@ -15,10 +15,12 @@ Usage:
 """
 
 import asyncio
-import base64
 import json
 import mimetypes
 import os
+import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -27,72 +29,180 @@ from langchain_anthropic import ChatAnthropic
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 
+try:
+    # Optional: faster JSON parsing/serialization
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
 # Store attached files for the session
-attached_files: list[dict] = []
+attached_files: list["FileInfo"] = []
 auto_pass_used: set[str] = set()
 
+# Bytes read from stdin past the end of the current line
+_stdin_buffer = bytearray()
+
+HELP_TEXT = (
+    "\nCommands:\n"
+    "  /attach <file>  - Attach a file to the conversation\n"
+    "  /files          - List attached files\n"
+    "  /clear          - Clear attached files\n"
+    "  /help           - Show this help\n"
+    "  quit/exit       - Exit the agent\n"
+)
+
+# skills-kit CLI used to serve a skill over stdio
+CLI_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../packages/cli/dist/index.js"))
+
+# How long a client keeps reusing its single-tool lookup
+TOOLS_CACHE_TTL = 60.0
+
+# Non text/* MIME types whose content is still readable text
+TEXT_MIME_TYPES = frozenset({
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-yaml",
+})
+
+# Common attachment types, checked before falling back to the system mimetypes database
+FAST_MIME_TYPES = {
+    ".json": "application/json",
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".py": "text/x-python",
+    ".csv": "text/csv",
+    ".html": "text/html",
+    ".xml": "application/xml",
+    ".yaml": "application/x-yaml",
+    ".yml": "application/x-yaml",
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+}
+
+
+def json_loads(raw: bytes) -> object:
+    """Parse JSON from bytes, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson is stricter (e.g. NaN, integers past 64 bits); let stdlib have a go
+            pass
+    return json.loads(raw)
+
+
+def json_dumps_pretty(value: object) -> str:
+    """Serialize a value as indented JSON, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2).decode("utf-8")
+        except TypeError:
+            # orjson is stricter (e.g. non-str keys); let stdlib have a go
+            pass
+    return json.dumps(value, indent=2, ensure_ascii=False)
+
+
+@dataclass(slots=True)
+class FileInfo:
+    """An attached file: metadata, its prompt fragment and, for JSON, the raw content."""
+
+    filename: str
+    mime_type: str
+    size: int
+    path: str
+    # Raw bytes, kept only for JSON attachments
+    content: bytes | None = None
+    prompt_fragment: str = ""
+
 
-def load_file(file_path: str) -> dict:
-    """Load a file and return its metadata and base64 content."""
+def load_file(file_path: str) -> FileInfo:
+    """Load a file and return its metadata and prompt fragment."""
     path = Path(file_path)
     if not path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    mime_type, _ = mimetypes.guess_type(file_path)
-    if mime_type is None:
-        mime_type = "application/octet-stream"
+    mime_type = (
+        FAST_MIME_TYPES.get(path.suffix.lower())
+        or mimetypes.guess_type(file_path)[0]
+        or "application/octet-stream"
+    )
 
-    with open(path, "rb") as f:
+    # Single unbuffered whole-file read
+    with open(path, "rb", buffering=0) as f:
         content = f.read()
 
-    return {
-        "filename": path.name,
-        "mime_type": mime_type,
-        "data": base64.b64encode(content).decode("utf-8"),
-        "size": len(content),
-        "path": str(path.absolute())
-    }
-
+    is_json = mime_type == "application/json" or path.suffix == ".json"
+    file_info = FileInfo(
+        filename=path.name,
+        mime_type=mime_type,
+        size=len(content),
+        path=str(path.absolute()),
+        # Only JSON attachments are read again (by extract_json_payload)
+        content=content if is_json else None,
+    )
 
-def format_file_for_prompt(file_info: dict) -> str:
-    """Format file info for inclusion in prompt."""
-    # For text files, include content directly
-    if file_info["mime_type"].startswith("text/") or file_info["mime_type"] == "application/json":
+    text = None
+    if mime_type.startswith("text/") or mime_type in TEXT_MIME_TYPES:
         try:
-            content = base64.b64decode(file_info["data"]).decode("utf-8")
-            return f"\n--- File: {file_info['filename']} ---\n{content}\n--- End of {file_info['filename']} ---\n"
-        except:
+            text = content.decode("utf-8")
+        except UnicodeDecodeError:
             pass
 
+    # Attachments don't change between turns, so format them for prompts once
+    file_info.prompt_fragment = format_file_for_prompt(file_info, text)
+
+    return file_info
+
+
+def format_file_for_prompt(file_info: FileInfo, text: str | None) -> str:
+    """Format file info for inclusion in prompt, given its decoded text (None for binary files)."""
+    # For text files, include content directly
+    if text is not None:
+        filename = file_info.filename
+        return "".join(["\n--- File: ", filename, " ---\n", text, "\n--- End of ", filename, " ---\n"])
+
     # For binary files, include metadata
-    return f"\n[Attached file: {file_info['filename']} ({file_info['mime_type']}, {file_info['size']} bytes)]\n"
+    return f"\n[Attached file: {file_info.filename} ({file_info.mime_type}, {file_info.size} bytes)]\n"
 
 
-def build_prompt_with_files(prompt: str, files: list[dict]) -> str:
+def build_prompt_with_files(prompt: str, files: list[FileInfo]) -> str:
     """Build a prompt that includes file contents/references."""
     if not files:
         return prompt
 
-    file_context = "\n".join(format_file_for_prompt(f) for f in files)
-    return f"{file_context}\n{prompt}"
+    # One join so large attachments are copied into the prompt only once
+    parts = [f.prompt_fragment for f in files]
+    parts.append(prompt)
+    return "\n".join(parts)
 
 
-def extract_json_payload(files: list[dict], used_filenames: set[str] | None = None) -> tuple[object, str] | None:
+def _looks_like_json(content: bytes) -> bool:
+    """Cheaply check whether content starts like a JSON object or array."""
+    for byte in content[:64]:
+        if byte in b" \t\r\n":
+            continue
+        return byte in b"{["
+    return False
+
+
+def extract_json_payload(files: list[FileInfo], used_filenames: set[str] | None = None) -> tuple[object, str] | None:
     """Return parsed JSON content and filename from the first suitable attachment."""
     if not files:
         return None
     for file_info in files:
-        filename = file_info.get("filename", "")
+        filename = file_info.filename
         if used_filenames and filename in used_filenames:
             continue
-        is_json = file_info.get("mime_type") == "application/json" or filename.endswith(".json")
-        if not is_json:
+        content = file_info.content
+        if content is None or not _looks_like_json(content):
             continue
         try:
-            raw = base64.b64decode(file_info["data"]).decode("utf-8")
-            return json.loads(raw), filename
+            return json_loads(content), filename
         except Exception:
             continue
     return None
@@ -114,7 +224,7 @@ def format_tool_result(result) -> str:
     structured = getattr(result, "structuredContent", None)
     if structured is not None:
         try:
-            text_parts.append(json.dumps(structured, indent=2))
+            text_parts.append(json_dumps_pretty(structured))
         except Exception:
             text_parts.append(str(structured))
     for item in getattr(result, "content", []) or []:
@@ -127,35 +237,77 @@ def format_tool_result(result) -> str:
     return str(result)
 
 
-async def maybe_auto_call_tool(
-    client: MCPClient,
-    files: list[dict],
-    used_filenames: set[str] | None = None,
-) -> str | None:
-    """If exactly one tool exists and a JSON attachment is present, call the tool directly."""
-    payload_info = extract_json_payload(files, used_filenames)
-    if not payload_info:
-        return None
-    payload, filename = payload_info
+async def disconnect_client(client: MCPClient) -> None:
+    """Disconnect all sessions and drop the cached tool lookup."""
+    if hasattr(client, "_singleton_tool"):
+        del client._singleton_tool
+    try:
+        await client.disconnect_all()
+    except Exception:
+        pass
+
 
+async def get_singleton_tool(client: MCPClient) -> tuple[str, object, object, dict] | None:
+    """Return (server_name, session, tool, input_schema) if the client exposes exactly one tool."""
     sessions = client.get_all_active_sessions()
+    cached = getattr(client, "_singleton_tool", None)
+    # Reuse a recent answer only if it was computed from these same sessions,
+    # so a client disconnected directly with disconnect_all() gets re-listed
+    if cached is not None:
+        cached_at, cached_sessions, singleton = cached
+        if (
+            time.monotonic() - cached_at < TOOLS_CACHE_TTL
+            and cached_sessions.keys() == sessions.keys()
+            and all(sessions[name] is session for name, session in cached_sessions.items())
+        ):
+            return singleton
+
     if not sessions:
         sessions = await client.create_all_sessions()
 
+    # List every server's tools concurrently rather than one round-trip at a time
+    results = await asyncio.gather(
+        *(session.list_tools() for session in sessions.values()),
+        return_exceptions=True,
+    )
+
     tools: list[tuple[str, object, object]] = []
-    for server_name, session in sessions.items():
-        try:
-            session_tools = await session.list_tools()
-        except Exception:
+    failed = False
+    for (server_name, session), session_tools in zip(sessions.items(), results):
+        if isinstance(session_tools, BaseException):
+            failed = True
             continue
         for tool in session_tools:
             tools.append((server_name, session, tool))
 
-    if len(tools) != 1:
+    singleton = None
+    if len(tools) == 1:
+        server_name, session, tool = tools[0]
+        input_schema = getattr(tool, "inputSchema", {}) or {}
+        singleton = (server_name, session, tool, input_schema)
+
+    # Don't remember an answer based on a partial listing
+    if not failed:
+        client._singleton_tool = (time.monotonic(), dict(sessions), singleton)
+    return singleton
+
+
+async def maybe_auto_call_tool(
+    client: MCPClient,
+    files: list[FileInfo],
+    used_filenames: set[str] | None = None,
+) -> str | None:
+    """If exactly one tool exists and a JSON attachment is present, call the tool directly."""
+    payload_info = extract_json_payload(files, used_filenames)
+    if not payload_info:
         return None
+    payload, filename = payload_info
 
-    server_name, session, tool = tools[0]
-    input_schema = getattr(tool, "inputSchema", {}) or {}
+    singleton = await get_singleton_tool(client)
+    if singleton is None:
+        return None
+
+    server_name, session, tool, input_schema = singleton
     if not payload_matches_schema(input_schema, payload):
         return None
 
@@ -180,10 +332,40 @@ def get_llm(provider: str = "anthropic"):
         )
 
 
-async def run_agent(prompt: str, provider: str = "anthropic", files: list[dict] = None):
-    """Run the MCP agent with the given prompt and optional files."""
+async def read_input(prompt: str) -> str:
+    """Read a line from stdin without blocking the event loop."""
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
 
-    # Configure MCP server connection
+    loop = asyncio.get_running_loop()
+    fd = sys.stdin.fileno()
+    while b"\n" not in _stdin_buffer:
+        readable = loop.create_future()
+        try:
+            loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        except (OSError, NotImplementedError):
+            # Regular files (redirected stdin) and Windows consoles can't be
+            # watched by the loop; fall back to a plain blocking read
+            pass
+        else:
+            try:
+                await readable
+            finally:
+                loop.remove_reader(fd)
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            if _stdin_buffer:
+                break
+            raise EOFError
+        _stdin_buffer.extend(chunk)
+
+    line, _, rest = bytes(_stdin_buffer).partition(b"\n")
+    _stdin_buffer[:] = rest
+    return line.decode(sys.stdin.encoding or "utf-8", errors="replace")
+
+
+def create_http_client() -> MCPClient:
+    """Create an MCP client for the server at MCP_SERVER_URL."""
     # Use base URL - mcp-use auto-detects Streamable HTTP vs SSE transport
     config = {
         "mcpServers": {
@@ -192,64 +374,63 @@ async def run_agent(prompt: str, provider: str = "anthropic", files: list[dict]
             }
         }
     }
+    return MCPClient.from_dict(config)
 
-    # Create MCP client
-    client = MCPClient.from_dict(config)
 
-    try:
-        auto_result = await maybe_auto_call_tool(client, files or [])
-        if auto_result is not None:
-            return auto_result
-
-        # Create LLM only if we didn't auto-call a tool
-        llm = get_llm(provider)
-
-        # Create agent
-        agent = MCPAgent(
-            llm=llm,
-            client=client,
-            use_server_manager=False,
-            max_iterations=10
-        )
+async def run_agent(client: MCPClient, prompt: str, provider: str = "anthropic", files: list[FileInfo] = None):
+    """Run the MCP agent over the caller's client with the given prompt and optional files."""
+    auto_result = await maybe_auto_call_tool(client, files or [])
+    if auto_result is not None:
+        return auto_result
+
+    # Create LLM only if we didn't auto-call a tool
+    llm = get_llm(provider)
 
-        # Build prompt with file context
-        full_prompt = build_prompt_with_files(prompt, files or [])
+    # Create agent
+    agent = MCPAgent(
+        llm=llm,
+        client=client,
+        use_server_manager=False,
+        max_iterations=10
+    )
+
+    # Build prompt with file context
+    full_prompt = build_prompt_with_files(prompt, files or [])
+
+    result = await agent.run(full_prompt)
+    return result
 
-        result = await agent.run(full_prompt)
-        return result
+
+async def run_prompt(prompt: str, provider: str = "anthropic", files: list[FileInfo] = None):
+    """Run a single prompt from the CLI over one shared client."""
+    client = create_http_client()
+    try:
+        return await run_agent(client, prompt, provider, files)
     finally:
-        try:
-            await client.disconnect_all()
-        except Exception:
-            pass
+        await disconnect_client(client)
 
 
 async def interactive_mode(provider: str = "anthropic", skill_path: str = None):
     """Run agent in interactive mode."""
     global attached_files
 
-    print("Skills-Kit MCP Agent (Interactive Mode)")
-    print("=" * 40)
-    print(f"Provider: {provider}")
-    print("\nCommands:")
-    print("  /attach <file>  - Attach a file to the conversation")
-    print("  /files          - List attached files")
-    print("  /clear          - Clear attached files")
-    print("  /help           - Show this help")
-    print("  quit/exit       - Exit the agent")
-    print()
+    sys.stdout.write(
+        "Skills-Kit MCP Agent (Interactive Mode)\n"
+        f"{'=' * 40}\n"
+        f"Provider: {provider}\n"
+        f"{HELP_TEXT}\n"
+    )
 
     # Configure MCP server - use stdio transport for better compatibility
     if skill_path:
         # Resolve to absolute path to avoid path traversal issues
         abs_skill_path = os.path.abspath(skill_path)
-        cli_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../packages/cli/dist/index.js"))
         config = {
             "mcpServers": {
                 "skills": {
                     "command": "node",
                     "args": [
-                        cli_path,
+                        CLI_PATH,
                         "serve",
                         abs_skill_path,
                         "--transport", "stdio",
@@ -258,24 +439,25 @@ async def interactive_mode(provider: str = "anthropic", skill_path: str = None):
                 }
             }
         }
+        client = MCPClient.from_dict(config)
     else:
         # Connect to MCP server via Streamable HTTP
-        config = {
-            "mcpServers": {
-                "skills": {
-                    "url": os.getenv("MCP_SERVER_URL", "http://localhost:3000/mcp")
-                }
-            }
-        }
+        client = create_http_client()
 
-    client = MCPClient.from_dict(config)
     llm = get_llm(provider)
     agent = MCPAgent(llm=llm, client=client, use_server_manager=False)
 
     try:
+        # Open sessions up front so the first turn doesn't pay for the handshake;
+        # if the server isn't reachable yet, the first turn will try again
+        try:
+            await client.create_all_sessions()
+        except Exception as e:
+            print(f"Warning: could not connect to MCP server yet: {e}")
+
         while True:
             try:
-                user_input = input("\nYou: ").strip()
+                user_input = (await read_input("\nYou: ")).strip()
 
                 if not user_input:
                     continue
@@ -288,9 +470,9 @@ async def interactive_mode(provider: str = "anthropic", skill_path: str = None):
                 if user_input.startswith("/attach "):
                     file_path = user_input[8:].strip()
                     try:
-                        file_info = load_file(file_path)
+                        file_info = await asyncio.to_thread(load_file, file_path)
                         attached_files.append(file_info)
-                        print(f"Attached: {file_info['filename']} ({file_info['mime_type']}, {file_info['size']} bytes)")
+                        print(f"Attached: {file_info.filename} ({file_info.mime_type}, {file_info.size} bytes)")
                     except Exception as e:
                         print(f"Error: {e}")
                     continue
@@ -299,7 +481,7 @@ async def interactive_mode(provider: str = "anthropic", skill_path: str = None):
                     if attached_files:
                         print("Attached files:")
                         for i, f in enumerate(attached_files, 1):
-                            print(f"  {i}. {f['filename']} ({f['mime_type']}, {f['size']} bytes)")
+                            print(f"  {i}. {f.filename} ({f.mime_type}, {f.size} bytes)")
                     else:
                         print("No files attached")
                     continue
@@ -310,12 +492,7 @@ async def interactive_mode(provider: str = "anthropic", skill_path: str = None):
                     continue
 
                 if user_input == "/help":
-                    print("\nCommands:")
-                    print("  /attach <file>  - Attach a file to the conversation")
-                    print("  /files          - List attached files")
-                    print("  /clear          - Clear attached files")
-                    print("  /help           - Show this help")
-                    print("  quit/exit       - Exit the agent")
+                    sys.stdout.write(HELP_TEXT)
                     continue
 
                 # Build prompt with attached files
@@ -335,10 +512,7 @@ async def interactive_mode(provider: str = "anthropic", skill_path: str = None):
                 break
     finally:
         # Cleanup - MCPClient uses disconnect_all()
-        try:
-            await client.disconnect_all()
-        except Exception:
-            pass
+        await disconnect_client(client)
 
 
 def main():
@@ -388,20 +562,25 @@ def main():
             try:
                 file_info = load_file(file_path)
                 files.append(file_info)
-                print(f"Loaded: {file_info['filename']} ({file_info['size']} bytes)")
+                print(f"Loaded: {file_info.filename} ({file_info.size} bytes)")
             except Exception as e:
                 print(f"Error loading {file_path}: {e}")
                 return
 
     if args.prompt:
         # Single prompt mode
-        result = asyncio.run(run_agent(args.prompt, args.provider, files))
+        result = asyncio.run(run_prompt(args.prompt, args.provider, files))
         print(result)
     else:
         # Interactive mode (preload files if any)
         global attached_files
         attached_files = files
-        asyncio.run(interactive_mode(args.provider, args.skill_path))
+        try:
+            asyncio.run(interactive_mode(args.provider, args.skill_path))
+        except KeyboardInterrupt:
+            # Ctrl+C while awaiting input or the agent: the session has already
+            # been cleaned up by interactive_mode's finally block
+            print("\nGoodbye!")
 
 
 if __name__ == "__main__":